@@ -1,14 +1,20 @@
-from flask import Flask, render_template_string, request, send_file, redirect, url_for, flash, session
+from flask import Flask, render_template_string, request, send_file, redirect, url_for, flash, session, Response
 import yt_dlp
 import os
 import tempfile
 import threading
 import time
 import shutil
+import math
+import importlib.util
+from transcription_range import check_range
 
 app = Flask(__name__)
 app.secret_key = 'your_secret_key'  # Needed for flashing messages and session
 
+# Transcription needs openai-whisper, which is too heavy for the default deployment
+TRANSCRIBE_AVAILABLE = importlib.util.find_spec('whisper') is not None
+
 # HTML template with Bootstrap and progress bar
 TEMPLATE = '''
 <!doctype html>
@@ -33,6 +39,26 @@ TEMPLATE = '''
     </div>
     <button type="submit" class="btn btn-primary">Extract Audio</button>
   </form>
+  {% if transcribe_available %}
+  <h4 class="mt-5 mb-3">Transcribe a Section</h4>
+  <form method="post" action="{{ url_for('transcribe') }}">
+    <div class="mb-3">
+      <label for="transcribeUrl" class="form-label">YouTube URL:</label>
+      <input type="text" class="form-control" name="url" id="transcribeUrl" required placeholder="Paste YouTube link here">
+    </div>
+    <div class="row mb-3">
+      <div class="col">
+        <label for="start" class="form-label">Start:</label>
+        <input type="text" class="form-control" name="start" id="start" placeholder="e.g. 90:00">
+      </div>
+      <div class="col">
+        <label for="end" class="form-label">End:</label>
+        <input type="text" class="form-control" name="end" id="end" placeholder="e.g. 95:00">
+      </div>
+    </div>
+    <button type="submit" class="btn btn-secondary">Transcribe</button>
+  </form>
+  {% endif %}
   <div id="progressSection" class="mt-4" style="display:none;">
     <label class="form-label">Processing:</label>
     <div class="progress">
@@ -111,10 +137,74 @@ def index():
             static_path = os.path.join('static', filename)
             os.makedirs('static', exist_ok=True)
             shutil.move(mp3_file, static_path)
-            return render_template_string(TEMPLATE, filename=filename)
+            return render_template_string(TEMPLATE, filename=filename, transcribe_available=TRANSCRIBE_AVAILABLE)
         except Exception as e:
             flash(f"Error: {e}")
-    return render_template_string(TEMPLATE, filename=None)
+    return render_template_string(TEMPLATE, filename=None, transcribe_available=TRANSCRIBE_AVAILABLE)
+
+def download_audio_range(url, start=None, end=None):
+    """Download only the start-end section of a video's audio, in its original codec"""
+    temp_dir = tempfile.mkdtemp()
+    ydl_opts = {
+        'format': 'bestaudio/best',
+        'outtmpl': os.path.join(temp_dir, '%(title)s.%(ext)s'),
+        'cookiefile': 'cookies.txt',
+        'quiet': True,
+    }
+    if start is not None or end is not None:
+        # Fetch just the section instead of the whole stream, and skip the MP3 re-encode
+        ydl_opts['download_ranges'] = yt_dlp.utils.download_range_func(
+            None, [(start or 0, end if end is not None else float('inf'))])
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=True)
+        downloads = info.get('requested_downloads') or [{}]
+        return downloads[0].get('filepath') or ydl.prepare_filename(info)
+
+def parse_time(value):
+    """Parse '90', '1:30' or '1:30:00' into seconds; empty means not set"""
+    value = (value or '').strip()
+    if not value:
+        return None
+    seconds = 0.0
+    for part in value.split(':'):
+        number = float(part)
+        if not math.isfinite(number) or number < 0:
+            raise ValueError(f"Invalid time: {value}")
+        seconds = seconds * 60 + number
+    return seconds
+
+@app.route('/transcribe', methods=['POST'])
+def transcribe():
+    """Transcribe only the requested start-end range of a YouTube video's audio"""
+    url = request.form.get('url')
+    try:
+        if not TRANSCRIBE_AVAILABLE:
+            raise RuntimeError("Transcription is not available: install openai-whisper")
+
+        start = parse_time(request.form.get('start'))
+        end = parse_time(request.form.get('end'))
+        check_range(start, end)
+
+        # Whisper is heavy and optional, so only load it when a transcription is requested
+        from whisper_audio_to_text import transcribe_with_whisper, format_transcript
+
+        audio_file = download_audio_range(url, start, end)
+        try:
+            result = transcribe_with_whisper(audio_file, model_size='base')
+        finally:
+            shutil.rmtree(os.path.dirname(audio_file), ignore_errors=True)
+
+        if not result:
+            raise RuntimeError("Transcription failed")
+
+        # The downloaded section starts at 0, so shift timestamps back onto the original video
+        for segment in result['segments']:
+            segment['start'] += start or 0
+            segment['end'] += start or 0
+        return Response(format_transcript(result, include_timestamps=True), mimetype='text/plain')
+    except Exception as e:
+        flash(f"Error: {e}")
+        return redirect(url_for('index'))
 
 @app.route('/download/<filename>')
 def download(filename):
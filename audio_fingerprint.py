@@ -0,0 +1,268 @@
+"""
+Acoustic Fingerprint Index
+==========================
+
+Computes a compact spectral-peak fingerprint from decoded PCM so the same
+recording can be recognised across re-uploads, mirrors and encodings (MP3 vs
+WAV), and keeps a local index of fingerprints with their transcripts so
+known audio can skip transcription entirely.
+"""
+
+import base64
+import json
+import os
+import uuid
+
+import numpy as np
+
+DEFAULT_INDEX_FILE = "fingerprint_index.jsonl"
+DEFAULT_SAMPLE_RATE = 16000
+DEFAULT_MATCH_THRESHOLD = 0.15
+
+# Recordings whose fingerprinted lengths differ more than this are never the same
+# recording, e.g. a clip of a longer file, whose transcript would not fit
+MIN_LENGTH_RATIO = 0.9
+
+FRAME_SIZE = 1024
+HOP_SIZE = 512
+FRAMES_PER_BLOCK = 4096  # Bounds spectrogram memory on long files
+
+# A peak must be the loudest point within this many frames/bins around it
+PEAK_TIME_NEIGHBOURHOOD = 5
+PEAK_FREQ_NEIGHBOURHOOD = 10
+
+# Each anchor peak is paired with up to FAN_OUT peaks in its target zone, which
+# starts a few frames later so pairs span real spectral movement
+FAN_OUT = 5
+MIN_TIME_DELTA = 3
+MAX_TIME_DELTA = 63  # In frames, must fit in 6 bits of the hash
+
+def _sliding_max(values, radius, axis):
+    """Maximum over a window of 2*radius+1 along one axis, keeping the shape"""
+    pad = [(0, 0)] * values.ndim
+    pad[axis] = (radius, radius)
+    padded = np.pad(values, pad, constant_values=-np.inf)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * radius + 1, axis=axis)
+    return windows.max(axis=-1)
+
+def _find_peaks(samples, scale=1.0):
+    """Return frame and bin arrays of spectral peaks, ordered by frame"""
+    if len(samples) < FRAME_SIZE:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    # Scaling is folded into the window so integer samples are only converted a block at a time
+    window = (np.hanning(FRAME_SIZE) * scale).astype(np.float32)
+    frame_count = 1 + (len(samples) - FRAME_SIZE) // HOP_SIZE
+    frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME_SIZE)[::HOP_SIZE]
+    peak_frames = []
+    peak_bins = []
+
+    for block_start in range(0, frame_count, FRAMES_PER_BLOCK):
+        # Overlap blocks so peaks near a block edge see their full neighbourhood
+        context_start = max(0, block_start - PEAK_TIME_NEIGHBOURHOOD)
+        context_end = min(frame_count, block_start + FRAMES_PER_BLOCK + PEAK_TIME_NEIGHBOURHOOD)
+        block = frames[context_start:context_end] * window
+        spectrum = np.log1p(np.abs(np.fft.rfft(block, axis=1)))
+
+        local_max = _sliding_max(_sliding_max(spectrum, PEAK_FREQ_NEIGHBOURHOOD, axis=1),
+                                 PEAK_TIME_NEIGHBOURHOOD, axis=0)
+        # Ignore local maxima in near-silence, which are mostly noise
+        is_peak = (spectrum == local_max) & (spectrum > spectrum.mean() + spectrum.std())
+        is_peak[:, 0] = False
+
+        frame_indices, bin_indices = np.nonzero(is_peak)
+        frame_indices = frame_indices + context_start
+        inside = (frame_indices >= block_start) & (frame_indices < block_start + FRAMES_PER_BLOCK)
+        peak_frames.append(frame_indices[inside])
+        peak_bins.append(bin_indices[inside])
+
+    return np.concatenate(peak_frames), np.concatenate(peak_bins)
+
+def compute_fingerprint(samples, scale=1.0):
+    """
+    Compute a spectral-peak fingerprint from mono PCM samples
+
+    Args:
+        samples: 1-D array of mono PCM samples at DEFAULT_SAMPLE_RATE
+            (fingerprints are only comparable at the same rate)
+        scale: Factor mapping the samples to [-1, 1], e.g. 1 / 32768 for int16
+
+    Returns:
+        tuple: (hashes, frames) int64 arrays sorted by hash; each hash pairs an
+        anchor peak with a later peak, and frames holds the anchor's frame
+    """
+    peak_frames, peak_bins = _find_peaks(np.asarray(samples), scale)
+    hashes = []
+    anchors = []
+
+    # First peak at or after each anchor's target zone, then the next FAN_OUT peaks from there
+    zone_starts = np.searchsorted(peak_frames, peak_frames + MIN_TIME_DELTA, side='left')
+    for step in range(FAN_OUT):
+        targets = zone_starts + step
+        valid = targets < len(peak_frames)
+        anchor_index = np.nonzero(valid)[0]
+        target_index = targets[valid]
+        delta = peak_frames[target_index] - peak_frames[anchor_index]
+        in_zone = delta <= MAX_TIME_DELTA
+        anchor_index, target_index, delta = anchor_index[in_zone], target_index[in_zone], delta[in_zone]
+
+        hashes.append((peak_bins[anchor_index] << 16) | (peak_bins[target_index] << 6) | delta)
+        anchors.append(peak_frames[anchor_index])
+
+    hashes = np.concatenate(hashes).astype(np.int64) if hashes else np.empty(0, dtype=np.int64)
+    anchors = np.concatenate(anchors).astype(np.int64) if anchors else np.empty(0, dtype=np.int64)
+    order = np.argsort(hashes, kind='stable')
+    return hashes[order], anchors[order]
+
+def compute_wav_fingerprint(wav):
+    """
+    Compute a fingerprint straight from a MappedWav without decoding it into memory
+
+    The samples are read through the mapping block by block, so memory use is
+    bounded by FRAMES_PER_BLOCK rather than the length of the recording.
+
+    Args:
+        wav: MappedWav holding 16-bit mono PCM at DEFAULT_SAMPLE_RATE
+    """
+    if wav.channels != 1 or wav.sample_width != 2 or wav.sample_rate != DEFAULT_SAMPLE_RATE:
+        raise ValueError(f"Fingerprinting needs 16-bit mono {DEFAULT_SAMPLE_RATE} Hz WAV: {wav.path}")
+
+    samples = np.frombuffer(wav.frames(0, wav.frame_count), dtype='<i2')
+    return compute_fingerprint(samples, scale=1 / 32768)
+
+def fingerprint_similarity(fingerprint_a, fingerprint_b):
+    """
+    Fraction of landmark hashes shared at one consistent time offset
+
+    Hashes only count towards a match if their anchors line up at the same
+    offset (give or take a frame), so unrelated audio that happens to share
+    many hashes at scattered times scores low. The count is relative to the
+    larger fingerprint, and recordings of clearly different length never match.
+    """
+    hashes_a, frames_a = fingerprint_a
+    hashes_b, frames_b = fingerprint_b
+    if len(hashes_a) == 0 or len(hashes_b) == 0:
+        return 0.0
+
+    span_a = frames_a.max() - frames_a.min() + 1
+    span_b = frames_b.max() - frames_b.min() + 1
+    if min(span_a, span_b) / max(span_a, span_b) < MIN_LENGTH_RATIO:
+        return 0.0
+
+    # Every (a, b) pair with equal hashes; b is sorted by hash so each hash is a slice
+    lows = np.searchsorted(hashes_b, hashes_a, side='left')
+    counts = np.searchsorted(hashes_b, hashes_a, side='right') - lows
+    total = counts.sum()
+    if total == 0:
+        return 0.0
+
+    starts = np.repeat(lows - np.cumsum(counts) + counts, counts)
+    b_index = starts + np.arange(total)
+    offsets = frames_b[b_index] - np.repeat(frames_a, counts)
+
+    histogram = np.bincount(offsets - offsets.min())
+    # Let encoder delay that lands between two frames still count as one offset
+    aligned = histogram.copy()
+    aligned[1:] += histogram[:-1]
+    aligned[:-1] += histogram[1:]
+
+    return min(1.0, aligned.max() / max(len(hashes_a), len(hashes_b)))
+
+def _encode_array(values):
+    return base64.b64encode(np.asarray(values, dtype='<i4').tobytes()).decode('ascii')
+
+def _decode_array(text):
+    return np.frombuffer(base64.b64decode(text), dtype='<i4').astype(np.int64)
+
+def _transcript_dir(index_file):
+    """Transcripts live next to the index, one file each, so lookups never read them"""
+    return os.path.splitext(index_file)[0] + "_transcripts"
+
+def load_index(index_file=DEFAULT_INDEX_FILE):
+    """Load the fingerprint index entries (without transcripts), or none if it does not exist yet"""
+    if not os.path.exists(index_file):
+        return []
+
+    entries = []
+    try:
+        with open(index_file, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                    entry['fingerprint'] = (_decode_array(entry['fingerprint']['hashes']),
+                                            _decode_array(entry['fingerprint']['frames']))
+                    entries.append(entry)
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"✗ Skipping unreadable fingerprint index line {line_number}: {e}")
+    except OSError as e:
+        print(f"✗ Could not read fingerprint index {index_file}: {e}")
+
+    return entries
+
+def find_match(fingerprint, options=None, index_file=DEFAULT_INDEX_FILE,
+               threshold=DEFAULT_MATCH_THRESHOLD):
+    """
+    Find the best matching known recording for a fingerprint
+
+    Args:
+        fingerprint: Fingerprint from compute_fingerprint
+        options: Transcription options the stored entry must have been produced with
+        index_file: Path to the index
+        threshold: Minimum similarity for a match
+
+    Returns:
+        dict: The matching index entry (with 'transcript' and 'source'), or None
+    """
+    best_entry = None
+    best_score = threshold
+
+    for entry in load_index(index_file):
+        if entry.get('options') != options:
+            continue
+        score = fingerprint_similarity(fingerprint, entry['fingerprint'])
+        if score >= best_score:
+            best_entry, best_score = entry, score
+
+    if not best_entry:
+        return None
+
+    # Only the winning entry's transcript is ever read
+    transcript_path = os.path.join(_transcript_dir(index_file), best_entry['transcript_file'])
+    try:
+        with open(transcript_path, 'r', encoding='utf-8') as f:
+            best_entry['transcript'] = f.read()
+    except OSError as e:
+        print(f"✗ Could not read stored transcript {transcript_path}: {e}")
+        return None
+
+    print(f"✓ Fingerprint matches {best_entry['source']} (similarity {best_score:.2f})")
+    return best_entry
+
+def store_transcript(fingerprint, transcript, source, options=None, index_file=DEFAULT_INDEX_FILE):
+    """
+    Add a fingerprint and its transcript to the index
+
+    The transcript goes to its own file first, then the fingerprint is added to
+    the append-only JSON Lines index with a single append, so existing entries are
+    never rewritten and the index never points at a missing transcript. Concurrent
+    writers do not drop each other's entries; if a platform interleaves their
+    appends, the damaged lines are skipped by load_index.
+    """
+    transcript_dir = _transcript_dir(index_file)
+    os.makedirs(transcript_dir, exist_ok=True)
+    transcript_file = f"{uuid.uuid4().hex}.txt"
+    with open(os.path.join(transcript_dir, transcript_file), 'w', encoding='utf-8') as f:
+        f.write(transcript)
+
+    hashes, frames = fingerprint
+    entry = {
+        "source": source,
+        "options": options,
+        "fingerprint": {"hashes": _encode_array(hashes), "frames": _encode_array(frames)},
+        "transcript_file": transcript_file,
+    }
+
+    with open(index_file, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry) + "\n")
@@ -3,16 +3,30 @@ import pydub
 from pydub import AudioSegment
 import os
 import glob
+import io
+import subprocess
+from mapped_wav import MappedWav
+from transcription_checkpoint import checkpoint_key, load_checkpoint, save_checkpoint, clear_checkpoint
+from transcription_range import check_range, format_range
 
-def convert_mp3_to_wav(mp3_file):
-    """Convert MP3 to WAV format for better speech recognition"""
+def convert_mp3_to_wav(mp3_file, start=None, end=None):
+    """Convert MP3 (or only its start-end range, in seconds) to WAV format for better speech recognition"""
     try:
-        # Load MP3 file
-        audio = AudioSegment.from_mp3(mp3_file)
+        # ffmpeg only reports a negative seek or empty duration as an opaque conversion error
+        check_range(start, end)
         
-        # Convert to WAV with optimal settings for speech recognition
         wav_file = mp3_file.replace('.mp3', '.wav')
-        audio.export(wav_file, format="wav", parameters=["-ac", "1", "-ar", "16000"])
+        
+        # Seeking before the input makes ffmpeg jump to the range instead of decoding from the start
+        command = [AudioSegment.converter, "-y", "-nostdin"]
+        if start:
+            command += ["-ss", str(start)]
+        if end is not None:
+            command += ["-t", str(end - (start or 0))]
+        
+        # Convert to WAV with optimal settings for speech recognition
+        command += ["-i", mp3_file, "-ac", "1", "-ar", "16000", wav_file]
+        subprocess.run(command, capture_output=True, check=True)
         
         print(f"✓ Converted {mp3_file} to {wav_file}")
         return wav_file
@@ -20,7 +34,7 @@ def convert_mp3_to_wav(mp3_file):
         print(f"✗ Error converting MP3 to WAV: {e}")
         return None
 
-def transcribe_audio(audio_file, language="auto", chunk_duration=60):
+def transcribe_audio(audio_file, language="auto", chunk_duration=60, offset=0):
     """
     Transcribe audio file to text
     
@@ -28,27 +42,47 @@ def transcribe_audio(audio_file, language="auto", chunk_duration=60):
         audio_file: Path to audio file (WAV format preferred)
         language: Language code (e.g., 'en-US', 'hi-IN', 'te-IN', 'auto' for auto-detection)
         chunk_duration: Duration of each chunk in seconds for processing large files
+        offset: Position of audio_file within the original recording in seconds, so
+            timestamps stay relative to the original when only a range was extracted
+    
+    Progress is checkpointed after every chunk, so re-running on the same audio
+    with the same options resumes from the last completed chunk.
     """
     recognizer = sr.Recognizer()
+    audio = None
     
     try:
-        # Load audio file
-        audio = AudioSegment.from_wav(audio_file)
-        duration = len(audio) / 1000  # Duration in seconds
+        # Map the audio file instead of loading it, so only the current chunk is resident
+        audio = MappedWav(audio_file)
+        
+        key = checkpoint_key(audio.frames(0, audio.frame_count),
+                             {"engine": "google", "language": language,
+                              "chunk_duration": chunk_duration, "offset": offset})
+        checkpoint = load_checkpoint(key)
+        duration = audio.duration  # Duration in seconds
         
         print(f"✓ Audio duration: {duration:.2f} seconds")
         print(f"✓ Processing audio in {chunk_duration}-second chunks...")
         
         full_text = ""
+        resume_from = 0
+        
+        if checkpoint:
+            full_text = checkpoint['full_text']
+            resume_from = checkpoint['next_start']
+            print(f"✓ Resuming from checkpoint at {resume_from} seconds")
         
         # Process audio in chunks for better accuracy and memory management
-        for start_time in range(0, int(duration), chunk_duration):
+        for start_time in range(resume_from, int(duration), chunk_duration):
             end_time = min(start_time + chunk_duration, int(duration))
+            chunk_start = int(offset + start_time)
+            chunk_end = int(offset + end_time)
+            label = f"[{chunk_start//60:02d}:{chunk_start%60:02d} - {chunk_end//60:02d}:{chunk_end%60:02d}]"
             
-            # Extract chunk
-            chunk = audio[start_time * 1000:end_time * 1000]
-            chunk_file = f"temp_chunk_{start_time}_{end_time}.wav"
-            chunk.export(chunk_file, format="wav")
+            # Extract chunk straight from the mapped samples into an in-memory WAV
+            chunk_file = io.BytesIO()
+            audio.write_range(start_time, end_time, chunk_file)
+            chunk_file.seek(0)
             
             try:
                 # Transcribe chunk
@@ -62,45 +96,52 @@ def transcribe_audio(audio_file, language="auto", chunk_duration=60):
                 if language == "auto":
                     # Try multiple languages for auto-detection
                     languages_to_try = ['en-US', 'hi-IN', 'te-IN', 'ta-IN', 'kn-IN']
+                    request_error = None
                     
                     for lang in languages_to_try:
                         try:
                             text = recognizer.recognize_google(audio_data, language=lang)
-                            print(f"✓ Chunk {start_time}-{end_time}s recognized in {lang}")
+                            print(f"✓ Chunk {chunk_start}-{chunk_end}s recognized in {lang}")
                             break
                         except sr.UnknownValueError:
                             continue
                         except sr.RequestError as e:
                             print(f"✗ Error with {lang}: {e}")
+                            request_error = e
                             continue
+                    
+                    # Without a service answer we cannot tell silence from an outage
+                    if not text and request_error:
+                        raise request_error
                 else:
                     text = recognizer.recognize_google(audio_data, language=language)
-                    print(f"✓ Chunk {start_time}-{end_time}s processed")
+                    print(f"✓ Chunk {chunk_start}-{chunk_end}s processed")
                 
                 if text:
-                    full_text += f"[{start_time//60:02d}:{start_time%60:02d} - {end_time//60:02d}:{end_time%60:02d}] {text}\n\n"
+                    full_text += f"{label} {text}\n\n"
                 else:
-                    full_text += f"[{start_time//60:02d}:{start_time%60:02d} - {end_time//60:02d}:{end_time%60:02d}] [No speech detected]\n\n"
-                
-                if start_time >= 300:  # Stop after processing the first 5 minutes
-                    print("✓ Processed first 5 minutes of audio")
-                    break
+                    full_text += f"{label} [No speech detected]\n\n"
             except sr.UnknownValueError:
-                print(f"✗ Could not understand audio in chunk {start_time}-{end_time}s")
-                full_text += f"[{start_time//60:02d}:{start_time%60:02d} - {end_time//60:02d}:{end_time%60:02d}] [Could not understand audio]\n\n"
+                print(f"✗ Could not understand audio in chunk {chunk_start}-{chunk_end}s")
+                full_text += f"{label} [Could not understand audio]\n\n"
             except sr.RequestError as e:
-                print(f"✗ Error with speech recognition service in chunk {start_time}-{end_time}s: {e}")
-                full_text += f"[{start_time//60:02d}:{start_time%60:02d} - {end_time//60:02d}:{end_time%60:02d}] [Recognition service error]\n\n"
-            finally:
-                # Clean up temporary chunk file
-                if os.path.exists(chunk_file):
-                    os.remove(chunk_file)
+                # Stop without checkpointing this chunk so a re-run retries it
+                print(f"✗ Error with speech recognition service in chunk {chunk_start}-{chunk_end}s: {e}")
+                print(f"✓ Progress up to {offset + start_time:g}s is checkpointed; re-run to resume")
+                raise
+            
+            # Persist completed work before moving on to the next chunk
+            save_checkpoint(key, {"next_start": start_time + chunk_duration, "full_text": full_text})
         
+        clear_checkpoint(key)
         return full_text.strip()
         
     except Exception as e:
         print(f"✗ Error transcribing audio: {e}")
         return None
+    finally:
+        if audio:
+            audio.close()
 
 def process_latest_mp3():
     """Find and process the most recently created MP3 file"""
@@ -115,8 +156,8 @@ def process_latest_mp3():
     latest_mp3 = max(mp3_files, key=os.path.getctime)
     print(f"✓ Processing latest MP3 file: {latest_mp3}")
     
-    # Convert MP3 to WAV
-    wav_file = convert_mp3_to_wav(latest_mp3)
+    # Convert only the first 5 minutes of the MP3 to WAV
+    wav_file = convert_mp3_to_wav(latest_mp3, end=300)
     if not wav_file:
         return
     
@@ -146,8 +187,8 @@ def process_latest_mp3():
         os.remove(wav_file)
         print(f"✓ Cleaned up temporary WAV file: {wav_file}")
 
-def transcribe_specific_file(mp3_file, language="auto"):
-    """Transcribe a specific MP3 file"""
+def transcribe_specific_file(mp3_file, language="auto", start=None, end=None):
+    """Transcribe a specific MP3 file, or only its start-end range in seconds"""
     if not os.path.exists(mp3_file):
         print(f"✗ File not found: {mp3_file}")
         return
@@ -155,23 +196,52 @@ def transcribe_specific_file(mp3_file, language="auto"):
     print(f"✓ Processing: {mp3_file}")
     
     # Convert MP3 to WAV
-    wav_file = convert_mp3_to_wav(mp3_file)
+    wav_file = convert_mp3_to_wav(mp3_file, start=start, end=end)
     if not wav_file:
         return
     
-    # Transcribe audio
-    print("✓ Starting transcription...")
-    transcript = transcribe_audio(wav_file, language=language)
+    # Reuse the transcript of a known recording, even if this copy is encoded differently
+    options = {"engine": "google", "language": language, "start": start, "end": end}
+    fingerprint = None
+    match = None
+    try:
+        # Imported here so a missing numpy only disables fingerprinting, not transcription
+        from audio_fingerprint import compute_wav_fingerprint, find_match, store_transcript
+        
+        # The WAV is already 16 kHz mono, so fingerprint it through the mapping
+        with MappedWav(wav_file) as wav:
+            fingerprint = compute_wav_fingerprint(wav)
+        match = find_match(fingerprint, options=options)
+    except Exception as e:
+        print(f"✗ Fingerprinting failed, transcribing from scratch: {e}")
+    
+    if match:
+        print(f"✓ Reusing transcript of: {match['source']}")
+        transcript = match['transcript']
+    else:
+        # Transcribe audio
+        print("✓ Starting transcription...")
+        transcript = transcribe_audio(wav_file, language=language, offset=start or 0)
     
     if transcript:
         # Save transcript to text file
         txt_file = mp3_file.replace('.mp3', '_transcript.txt')
+        if start or end is not None:
+            txt_file = mp3_file.replace('.mp3', f'_{format_range(start, end)}_transcript.txt')
         with open(txt_file, 'w', encoding='utf-8') as f:
             f.write(f"Transcript of: {mp3_file}\n")
             f.write("=" * 50 + "\n\n")
             f.write(transcript)
         
         print(f"✓ Transcript saved to: {txt_file}")
+        
+        # Index only after the transcript is safely on disk; a failed index write must not lose it
+        if not match and fingerprint is not None:
+            try:
+                store_transcript(fingerprint, transcript, mp3_file, options=options)
+            except Exception as e:
+                print(f"✗ Could not add transcript to fingerprint index: {e}")
+        
         print("\n" + "=" * 50)
         print("TRANSCRIPT PREVIEW:")
         print("=" * 50)
@@ -194,3 +264,5 @@ if __name__ == "__main__":
     
     # Uncomment below to transcribe a specific file:
     # transcribe_specific_file("Hair Fall - Dr.Bhanu Prasad Gadde.mp3", language="auto")
+    # Or only part of it, e.g. minutes 90-95:
+    # transcribe_specific_file("Hair Fall - Dr.Bhanu Prasad Gadde.mp3", language="auto", start=5400, end=5700)
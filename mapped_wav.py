@@ -0,0 +1,130 @@
+"""
+Memory-Mapped WAV Reader
+========================
+
+Opens a PCM WAV file with mmap and hands out zero-copy views over sample
+ranges, so memory use while chunking a long recording is bounded by the chunk
+size rather than the file size. Every process that opens the same file maps
+the same OS page cache pages, so parallel chunk workers do not multiply RSS.
+"""
+
+import mmap
+import struct
+import wave
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+# KSDATAFORMAT_SUBTYPE_PCM as stored in the file (little-endian GUID)
+SUBTYPE_PCM_GUID = bytes.fromhex('0100000000001000800000aa00389b71')
+
+class MappedWav:
+    """
+    Read-only, memory-mapped view of a PCM WAV file
+
+    Views returned by frames() and view() point straight into the mapping. They
+    stay valid after close(); the mapping is only unmapped once the last of them
+    has been released or garbage collected.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        self._view = memoryview(self._mmap)
+
+        try:
+            self._parse_header()
+        except Exception:
+            self.close()
+            raise
+
+    def _parse_header(self):
+        if self._view[0:4] != b'RIFF' or self._view[8:12] != b'WAVE':
+            raise ValueError(f"Not a WAV file: {self.path}")
+
+        fmt = None
+        subformat = None
+        position = 12
+
+        while position + 8 <= len(self._view):
+            chunk_id = self._view[position:position + 4].tobytes()
+            chunk_size, = struct.unpack('<I', self._view[position + 4:position + 8])
+            body = position + 8
+
+            if chunk_id == b'fmt ':
+                fmt = struct.unpack('<HHIIHH', self._view[body:body + 16])
+                if chunk_size >= 40:
+                    subformat = self._view[body + 24:body + 40].tobytes()
+            elif chunk_id == b'data':
+                # Streamed WAVs (e.g. from an ffmpeg pipe) can carry a bogus size
+                self._data_offset = body
+                self._data_size = min(chunk_size, len(self._view) - body)
+                break
+
+            position = body + chunk_size + (chunk_size & 1)
+        else:
+            raise ValueError(f"No data chunk in WAV file: {self.path}")
+
+        if fmt is None:
+            raise ValueError(f"No fmt chunk before data in WAV file: {self.path}")
+
+        audio_format, self.channels, self.sample_rate, _, self.frame_size, bits = fmt
+        if audio_format == WAVE_FORMAT_EXTENSIBLE:
+            # The real encoding lives in the SubFormat GUID, e.g. float32 is also extensible
+            if subformat != SUBTYPE_PCM_GUID:
+                raise ValueError(f"Unsupported WAV extensible subformat: {self.path}")
+        elif audio_format != WAVE_FORMAT_PCM:
+            raise ValueError(f"Unsupported WAV encoding {audio_format:#x}: {self.path}")
+
+        self.sample_width = bits // 8
+        self.frame_count = self._data_size // self.frame_size
+
+    @property
+    def duration(self):
+        """Duration in seconds"""
+        return self.frame_count / self.sample_rate
+
+    def frames(self, start_frame, end_frame):
+        """Zero-copy view over the raw PCM bytes of frames [start_frame, end_frame)"""
+        start_frame = max(0, min(start_frame, self.frame_count))
+        end_frame = max(start_frame, min(end_frame, self.frame_count))
+        start = self._data_offset + start_frame * self.frame_size
+        end = self._data_offset + end_frame * self.frame_size
+        return self._view[start:end]
+
+    def view(self, start_seconds, end_seconds):
+        """Zero-copy view over the raw PCM bytes between two times in seconds"""
+        return self.frames(int(start_seconds * self.sample_rate), int(end_seconds * self.sample_rate))
+
+    def write_range(self, start_seconds, end_seconds, fileobj):
+        """Write the audio between two times in seconds as a standalone WAV to fileobj"""
+        with wave.open(fileobj, 'wb') as out:
+            out.setnchannels(self.channels)
+            out.setsampwidth(self.sample_width)
+            out.setframerate(self.sample_rate)
+            out.writeframes(self.view(start_seconds, end_seconds))
+
+    def close(self):
+        """Close the file; the mapping is unmapped now or, if views are still alive, once they are released"""
+        try:
+            self._view.release()
+            self._mmap.close()
+        except BufferError:
+            # Outstanding views keep a reference to the mapping, which frees it when they go away
+            pass
+        finally:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __reduce__(self):
+        # Worker processes re-open and map the file themselves instead of copying the data
+        return (MappedWav, (self.path,))
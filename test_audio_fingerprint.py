@@ -0,0 +1,74 @@
+import wave
+
+import numpy as np
+
+from audio_fingerprint import (DEFAULT_MATCH_THRESHOLD, DEFAULT_SAMPLE_RATE, compute_fingerprint,
+                               compute_wav_fingerprint, find_match, fingerprint_similarity, store_transcript)
+from mapped_wav import MappedWav
+
+def speech_like_signal(seconds, seed):
+    """Harmonic signal with a syllable-like pitch contour and amplitude envelope"""
+    rng = np.random.default_rng(seed)
+    sample_count = seconds * DEFAULT_SAMPLE_RATE
+    syllables = rng.uniform(0.12, 0.35, size=int(seconds / 0.1) + 10)
+    edges = np.cumsum(syllables) * DEFAULT_SAMPLE_RATE
+    syllable = np.searchsorted(edges, np.arange(sample_count))
+
+    f0 = rng.uniform(90, 220, size=len(syllables))[syllable]
+    phase = 2 * np.pi * np.cumsum(f0) / DEFAULT_SAMPLE_RATE
+    harmonics = rng.uniform(0.2, 1.0, size=(len(syllables), 12))[syllable]
+    signal = sum(harmonics[:, k] * np.sin((k + 1) * phase) / (k + 1) for k in range(12))
+
+    position = np.arange(sample_count) - np.concatenate([[0], edges])[syllable]
+    envelope = np.sin(np.pi * position / (syllables[syllable] * DEFAULT_SAMPLE_RATE)).clip(0)
+    return (signal * envelope * 0.3 + rng.normal(0, 0.003, sample_count)).astype(np.float32)
+
+def reencoded(samples, seed):
+    """Simulate another encoding: low-pass, gain change, encoder delay and noise"""
+    rng = np.random.default_rng(seed)
+    filtered = np.convolve(samples, np.ones(3) / 3, mode='same') * 0.8
+    delayed = np.concatenate([np.zeros(1105), filtered])
+    return (delayed + rng.normal(0, 0.01, len(delayed))).astype(np.float32)
+
+def test_distinct_recordings_stay_below_threshold():
+    for seconds in (60, 300):
+        first = compute_fingerprint(speech_like_signal(seconds, seed=1))
+        second = compute_fingerprint(speech_like_signal(seconds, seed=2))
+        assert fingerprint_similarity(first, second) < DEFAULT_MATCH_THRESHOLD
+
+def test_reencoded_copy_matches():
+    samples = speech_like_signal(60, seed=1)
+    original = compute_fingerprint(samples)
+    copy = compute_fingerprint(reencoded(samples, seed=3))
+    assert fingerprint_similarity(original, copy) >= DEFAULT_MATCH_THRESHOLD
+
+def test_clip_does_not_match_full_recording():
+    samples = speech_like_signal(60, seed=1)
+    clip = compute_fingerprint(samples[:20 * DEFAULT_SAMPLE_RATE])
+    assert fingerprint_similarity(clip, compute_fingerprint(samples)) < DEFAULT_MATCH_THRESHOLD
+
+def test_wav_fingerprint_matches_decoded_samples(tmp_path):
+    pcm = (speech_like_signal(30, seed=1) * 32767).astype('<i2')
+    path = str(tmp_path / "a.wav")
+    with wave.open(path, 'wb') as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(DEFAULT_SAMPLE_RATE)
+        out.writeframes(pcm.tobytes())
+
+    with MappedWav(path) as wav:
+        hashes, frames = compute_wav_fingerprint(wav)
+    expected_hashes, expected_frames = compute_fingerprint(pcm.astype(np.float32) / 32768)
+    assert np.array_equal(hashes, expected_hashes) and np.array_equal(frames, expected_frames)
+
+def test_index_round_trip(tmp_path):
+    index_file = str(tmp_path / "index.jsonl")
+    samples = speech_like_signal(30, seed=1)
+    options = {"engine": "whisper", "model_size": "base"}
+    store_transcript(compute_fingerprint(samples), "hello", "a.mp3", options=options, index_file=index_file)
+
+    copy = compute_fingerprint(reencoded(samples, seed=3))
+    assert find_match(copy, options=options, index_file=index_file)['transcript'] == "hello"
+    assert find_match(copy, options={"engine": "google"}, index_file=index_file) is None
+    unrelated = compute_fingerprint(speech_like_signal(30, seed=2))
+    assert find_match(unrelated, options=options, index_file=index_file) is None
@@ -0,0 +1,116 @@
+import io
+import pickle
+import struct
+import wave
+
+import numpy as np
+import pytest
+
+from mapped_wav import SUBTYPE_PCM_GUID, WAVE_FORMAT_EXTENSIBLE, MappedWav
+
+SAMPLE_RATE = 16000
+
+def write_wav(path, samples, sample_rate=SAMPLE_RATE):
+    """Write int16 mono samples with the standard library writer"""
+    with wave.open(str(path), 'wb') as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(sample_rate)
+        out.writeframes(samples.astype('<i2').tobytes())
+
+def riff(*chunks):
+    """Assemble a RIFF/WAVE file from (chunk_id, body) pairs, padding odd-sized bodies"""
+    body = b''.join(chunk_id + struct.pack('<I', len(data)) + data + b'\0' * (len(data) & 1)
+                    for chunk_id, data in chunks)
+    return b'RIFF' + struct.pack('<I', 4 + len(body)) + b'WAVE' + body
+
+def fmt_chunk(audio_format=1, bits=16, subformat=None):
+    data = struct.pack('<HHIIHH', audio_format, 1, SAMPLE_RATE, SAMPLE_RATE * bits // 8, bits // 8, bits)
+    if subformat is not None:
+        data += struct.pack('<HHI', 22, bits, 0x4) + subformat
+    return (b'fmt ', data)
+
+@pytest.fixture
+def samples():
+    return np.arange(3 * SAMPLE_RATE, dtype=np.int64).astype('<i2')
+
+def test_frames_and_view_bounds(tmp_path, samples):
+    path = tmp_path / "a.wav"
+    write_wav(path, samples)
+
+    with MappedWav(str(path)) as wav:
+        assert wav.frame_count == len(samples)
+        assert wav.duration == 3
+        assert bytes(wav.frames(10, 20)) == samples[10:20].tobytes()
+        assert bytes(wav.view(1, 2)) == samples[SAMPLE_RATE:2 * SAMPLE_RATE].tobytes()
+        # Out-of-range requests are clamped instead of reading past the data chunk
+        assert bytes(wav.frames(-5, 3)) == samples[:3].tobytes()
+        assert bytes(wav.view(2.5, 10)) == samples[int(2.5 * SAMPLE_RATE):].tobytes()
+        assert len(wav.frames(20, 10)) == 0
+
+def test_write_range_round_trip(tmp_path, samples):
+    path = tmp_path / "a.wav"
+    write_wav(path, samples)
+    buffer = io.BytesIO()
+
+    with MappedWav(str(path)) as wav:
+        wav.write_range(0.5, 1.5, buffer)
+
+    buffer.seek(0)
+    with wave.open(buffer, 'rb') as clip:
+        assert (clip.getnchannels(), clip.getsampwidth(), clip.getframerate()) == (1, 2, SAMPLE_RATE)
+        assert clip.readframes(clip.getnframes()) == samples[SAMPLE_RATE // 2:3 * SAMPLE_RATE // 2].tobytes()
+
+def test_extensible_pcm_accepted_and_float_rejected(tmp_path, samples):
+    pcm = tmp_path / "pcm.wav"
+    pcm.write_bytes(riff(fmt_chunk(WAVE_FORMAT_EXTENSIBLE, subformat=SUBTYPE_PCM_GUID), (b'data', samples.tobytes())))
+    with MappedWav(str(pcm)) as wav:
+        assert wav.frame_count == len(samples)
+
+    # KSDATAFORMAT_SUBTYPE_IEEE_FLOAT differs from PCM only in the first byte
+    float_guid = b'\x03' + SUBTYPE_PCM_GUID[1:]
+    floats = tmp_path / "float.wav"
+    floats.write_bytes(riff(fmt_chunk(WAVE_FORMAT_EXTENSIBLE, bits=32, subformat=float_guid),
+                            (b'data', samples.astype('<f4').tobytes())))
+    with pytest.raises(ValueError, match="subformat"):
+        MappedWav(str(floats))
+
+def test_odd_sized_chunk_before_data(tmp_path, samples):
+    path = tmp_path / "a.wav"
+    path.write_bytes(riff(fmt_chunk(), (b'LIST', b'abc'), (b'data', samples[:100].tobytes())))
+
+    with MappedWav(str(path)) as wav:
+        assert wav.frame_count == 100
+        assert bytes(wav.frames(0, 100)) == samples[:100].tobytes()
+
+def test_bogus_data_size_is_clamped(tmp_path, samples):
+    data = bytearray(riff(fmt_chunk(), (b'data', samples[:100].tobytes())))
+    # Streamed WAVs often leave 0xFFFFFFFF in the data chunk size
+    data[40:44] = struct.pack('<I', 0xFFFFFFFF)
+    path = tmp_path / "a.wav"
+    path.write_bytes(bytes(data))
+
+    with MappedWav(str(path)) as wav:
+        assert wav.frame_count == 100
+
+def test_close_with_live_view(tmp_path, samples):
+    path = tmp_path / "a.wav"
+    write_wav(path, samples)
+
+    wav = MappedWav(str(path))
+    view = wav.frames(0, 10)
+    wav.close()
+    assert wav._file.closed
+    # The view keeps the mapping alive until it is released
+    assert bytes(view) == samples[:10].tobytes()
+    view.release()
+
+def test_pickle_reopens_file(tmp_path, samples):
+    path = tmp_path / "a.wav"
+    write_wav(path, samples)
+
+    with MappedWav(str(path)) as wav:
+        copy = pickle.loads(pickle.dumps(wav))
+    with copy:
+        assert copy.path == str(path)
+        assert bytes(copy.view(1, 1.01)) == samples[SAMPLE_RATE:SAMPLE_RATE + 160].tobytes()
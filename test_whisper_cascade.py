@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+
+whisper = pytest.importorskip("whisper")
+
+import whisper_audio_to_text as wat
+
+SAMPLE_RATE = whisper.audio.SAMPLE_RATE
+
+def make_segment(start, end, text, flagged=False):
+    return {"start": start, "end": end, "text": text,
+            "avg_logprob": -1.5 if flagged else -0.2, "no_speech_prob": 0.1, "compression_ratio": 1.2}
+
+class StubModel:
+    """Stands in for a Whisper model: one 0.5 s segment per half second of the clip"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.clip_seconds = []
+
+    def transcribe(self, clip, **options):
+        if self.fail:
+            raise RuntimeError("out of memory")
+        seconds = len(clip) / SAMPLE_RATE
+        self.clip_seconds.append(seconds)
+        starts = np.arange(0, seconds - 0.25, 0.5)
+        return {"segments": [{"start": float(t), "end": float(min(t + 0.5, seconds)), "text": " A"} for t in starts]}
+
+@pytest.fixture
+def cascade(monkeypatch):
+    """Run transcribe_with_cascade over 700 s where every fourth 10 s segment is low-confidence"""
+    fast_segments = [make_segment(t, t + 10, f" fast{t}", flagged=(t // 10) % 4 == 0) for t in range(0, 700, 10)]
+    accurate = StubModel()
+    full_passes = []
+    decodes = []
+
+    def fake_transcribe_with_whisper(audio_file, model_size="base", **kwargs):
+        if model_size != "tiny":
+            full_passes.append(model_size)
+            return {"text": " full", "segments": [make_segment(0, 700, " full")], "language": "en"}
+        return {"text": "", "segments": [dict(s) for s in fast_segments], "language": "en"}
+
+    def fake_load_audio_range(*args, **kwargs):
+        decodes.append(args)
+        return np.zeros(700 * SAMPLE_RATE, np.float32)
+
+    monkeypatch.setattr(wat, "transcribe_with_whisper", fake_transcribe_with_whisper)
+    monkeypatch.setattr(wat, "load_audio_range", fake_load_audio_range)
+    monkeypatch.setattr(wat.whisper, "load_model", lambda size: accurate)
+    accurate.decodes = decodes
+    return accurate, full_passes
+
+def test_needs_escalation():
+    assert wat.needs_escalation(make_segment(0, 1, "x", flagged=True))
+    assert not wat.needs_escalation(make_segment(0, 1, "x"))
+    assert wat.needs_escalation({"avg_logprob": -0.1, "compression_ratio": 3.0})
+    # Low confidence on silence is left alone
+    assert not wat.needs_escalation({"avg_logprob": -1.5, "no_speech_prob": 0.9})
+
+def test_find_escalation_ranges_merges_short_gaps():
+    segments = [make_segment(0, 2, "a", True), make_segment(2, 3, "b"), make_segment(3, 5, "c", True),
+                make_segment(5, 20, "d"), make_segment(20, 22, "e", True)]
+    assert wat.find_escalation_ranges(segments) == [(0, 5), (20, 22)]
+    assert wat.find_escalation_ranges(segments, max_gap=0) == [(0, 2), (3, 5), (20, 22)]
+
+def test_pack_escalation_ranges_fits_whisper_windows():
+    ranges = [(t, t + 8.5) for t in range(0, 700, 40)]
+    batches = wat.pack_escalation_ranges(ranges, 0, 700)
+    assert sum(len(batch) for batch in batches) == len(ranges)
+    for batch in batches:
+        assert sum(padded_end - padded_start for padded_start, padded_end, _, _ in batch) <= 30
+
+def test_redecode_batch_drops_padding_segments():
+    audio = np.zeros(60 * SAMPLE_RATE, np.float32)
+    batch = [(9.25, 12.75, 10, 12), (29.25, 32.75, 30, 32)]
+    replacements = wat.redecode_batch(StubModel(), audio, 0, batch, {})
+
+    for (padded_start, padded_end, range_start, range_end), new_segments in zip(batch, replacements):
+        assert new_segments
+        for segment in new_segments:
+            assert range_start <= segment['start'] < segment['end'] <= range_end
+
+def test_cascade_batches_and_splices_in_order(cascade):
+    accurate, full_passes = cascade
+    result = wat.transcribe_with_cascade("audio.mp3")
+
+    assert not full_passes
+    assert len(accurate.decodes) == 1
+    # 18 flagged ranges of 11.5 s padded pack two per window instead of one call each
+    assert len(accurate.clip_seconds) == 9
+    assert all(seconds <= 30 for seconds in accurate.clip_seconds)
+
+    segments = result['segments']
+    assert [s['id'] for s in segments] == list(range(len(segments)))
+    for previous, current in zip(segments, segments[1:]):
+        assert previous['start'] <= current['start'] and previous['end'] <= current['start'] + 1e-9
+
+    kept_fast = [s['text'] for s in segments if s['text'].startswith(" fast")]
+    assert kept_fast == [f" fast{t}" for t in range(0, 700, 10) if (t // 10) % 4 != 0]
+    for segment in segments:
+        if segment['text'] == " A":
+            assert any(start <= segment['start'] and segment['end'] <= end
+                       for start, end in result['cascade']['escalated_ranges'])
+    assert result['cascade']['escalated_seconds'] == 180
+
+def test_cascade_keeps_fast_transcript_when_escalation_fails(cascade):
+    accurate, _ = cascade
+    accurate.fail = True
+    result = wat.transcribe_with_cascade("audio.mp3")
+
+    assert [s['text'] for s in result['segments']] == [f" fast{t}" for t in range(0, 700, 10)]
+    assert result['cascade']['escalated_seconds'] == 0.0
+
+def test_cascade_runs_full_pass_when_mostly_low_confidence(cascade):
+    accurate, full_passes = cascade
+    result = wat.transcribe_with_cascade("audio.mp3", logprob_threshold=0.0)
+
+    assert full_passes == ["medium"]
+    assert not accurate.clip_seconds
+    assert result['cascade']['full_pass']
+    assert result['text'] == " full"
@@ -0,0 +1,62 @@
+"""
+Transcription Checkpoints
+=========================
+
+Persists partial transcription results after every chunk or window so that
+an interrupted run (network error, OOM, restart) on the same input with the
+same options resumes from the last completed chunk instead of starting over.
+"""
+
+import hashlib
+import json
+import os
+
+DEFAULT_CHECKPOINT_DIR = ".checkpoints"
+
+def checkpoint_key(samples, options):
+    """
+    Build a key from the decoded audio and the options that affect the transcript
+
+    samples is any bytes-like view of the audio actually being transcribed (a
+    NumPy array or a MappedWav view), so only the requested range is read rather
+    than the whole source file.
+    """
+    digest = hashlib.sha256()
+    digest.update(memoryview(samples).cast('B'))
+    digest.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+def _checkpoint_path(key, checkpoint_dir):
+    return os.path.join(checkpoint_dir, f"{key}.json")
+
+def load_checkpoint(key, checkpoint_dir=DEFAULT_CHECKPOINT_DIR):
+    """Return the saved state for a key, or None if there is nothing to resume"""
+    path = _checkpoint_path(key, checkpoint_dir)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"✗ Ignoring unreadable checkpoint {path}: {e}")
+        return None
+
+def save_checkpoint(key, state, checkpoint_dir=DEFAULT_CHECKPOINT_DIR):
+    """Durably save the state for a key"""
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    path = _checkpoint_path(key, checkpoint_dir)
+    temp_path = path + ".tmp"
+
+    # Write, flush to disk and rename so a crash never leaves a half-written checkpoint
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+def clear_checkpoint(key, checkpoint_dir=DEFAULT_CHECKPOINT_DIR):
+    """Remove the checkpoint for a key once its transcription has completed"""
+    path = _checkpoint_path(key, checkpoint_dir)
+    if os.path.exists(path):
+        os.remove(path)
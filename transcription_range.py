@@ -0,0 +1,21 @@
+"""
+Transcription Ranges
+====================
+
+Validation and naming for start/end time ranges, shared by the Whisper and
+speech_recognition transcribers and the web app. Kept free of audio
+dependencies so any of them can import it cheaply.
+"""
+
+import math
+
+def check_range(start=None, end=None):
+    """Raise ValueError unless the range in seconds satisfies end > start >= 0"""
+    if start is not None and not (math.isfinite(start) and start >= 0):
+        raise ValueError(f"Start must be a non-negative number of seconds, got {start}")
+    if end is not None and not (math.isfinite(end) and end > (start or 0)):
+        raise ValueError(f"End must be a number of seconds after start, got {end}")
+
+def format_range(start=None, end=None):
+    """Describe a time range for console output and file names, e.g. '5400-5700'"""
+    return f"{start or 0:g}-{end:g}" if end is not None else f"{start or 0:g}-end"
@@ -1,9 +1,41 @@
 import whisper
+import numpy as np
 import os
 import glob
+import bisect
+import subprocess
 import time
+from audio_fingerprint import compute_fingerprint, find_match, store_transcript
+from transcription_checkpoint import checkpoint_key, load_checkpoint, save_checkpoint, clear_checkpoint
+from transcription_range import check_range, format_range
 
-def transcribe_with_whisper(audio_file, model_size="base", language=None, task="transcribe"):
+# Length of audio transcribed between checkpoints
+CHECKPOINT_WINDOW_SECONDS = 300
+
+def load_audio_range(audio_file, start=None, end=None, sr=whisper.audio.SAMPLE_RATE):
+    """
+    Decode only part of an audio file to mono float32 PCM, like whisper.load_audio
+    
+    The seek is passed to ffmpeg as an input option, so it jumps to the start
+    position at the container level instead of decoding everything before it.
+    """
+    check_range(start, end)
+    cmd = ["ffmpeg", "-nostdin", "-threads", "0"]
+    if start:
+        cmd += ["-ss", str(start)]
+    if end is not None:
+        cmd += ["-t", str(end - (start or 0))]
+    cmd += ["-i", audio_file, "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sr), "-"]
+    
+    try:
+        out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to load audio: {e.stderr.decode()}") from e
+    
+    return np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+
+def transcribe_with_whisper(audio_file, model_size="base", language=None, task="transcribe",
+                            start=None, end=None, audio=None):
     """
     Transcribe audio file using OpenAI Whisper
     
@@ -12,9 +44,17 @@ def transcribe_with_whisper(audio_file, model_size="base", language=None, task="
         model_size: Whisper model size ('tiny', 'base', 'small', 'medium', 'large', 'turbo')
         language: Language code (e.g., 'en', 'hi', 'te', 'ta', 'kn') or None for auto-detection
         task: 'transcribe' or 'translate' (translate converts to English)
+        start: Start of the range to transcribe in seconds, or None for the beginning
+        end: End of the range to transcribe in seconds, or None for the end of the file
+        audio: Samples of that range already decoded by load_audio_range, to avoid decoding again
     
     Returns:
-        dict: Transcription result with text, language, and segments
+        dict: Transcription result with text, language, and segments; timestamps
+        are relative to the start of the original file
+    
+    The audio is transcribed in CHECKPOINT_WINDOW_SECONDS windows and progress is
+    checkpointed after each one, so re-running on the same audio with the same
+    options resumes from the last completed window.
     """
     print(f"🎵 Whisper Audio Transcription")
     print(f"=" * 35)
@@ -22,6 +62,8 @@ def transcribe_with_whisper(audio_file, model_size="base", language=None, task="
     print(f"🤖 Model: {model_size}")
     print(f"🌐 Language: {language if language else 'Auto-detect'}")
     print(f"⚙️ Task: {task}")
+    if start or end is not None:
+        print(f"⏱️ Range: {format_range(start, end)} seconds")
     print()
     
     try:
@@ -39,11 +81,73 @@ def transcribe_with_whisper(audio_file, model_size="base", language=None, task="
         if language:
             options["language"] = language
         
+        # Only the requested range is decoded; window offsets below are relative to it
+        if audio is None:
+            audio = load_audio_range(audio_file, start, end)
+        
+        key = checkpoint_key(audio, {"engine": "whisper", "model_size": model_size,
+                                     "language": language, "task": task,
+                                     "start": start, "end": end})
+        checkpoint = load_checkpoint(key)
+        total_seconds = len(audio) / whisper.audio.SAMPLE_RATE
+        clip_start = start or 0.0
+        
+        segments = []
+        offset = 0.0
+        detected_language = language
+        
+        if checkpoint:
+            segments = checkpoint['segments']
+            offset = checkpoint['offset']
+            detected_language = checkpoint['language']
+            print(f"⏩ Resuming from checkpoint at {offset:.1f} seconds")
+        
         print(f"🎙️ Starting transcription...")
         start_time = time.time()
         
-        # Transcribe the audio
-        result = model.transcribe(audio_file, **options)
+        # Transcribe the audio window by window
+        while offset < total_seconds:
+            window_end = min(offset + CHECKPOINT_WINDOW_SECONDS, total_seconds)
+            clip = audio[int(offset * whisper.audio.SAMPLE_RATE):int(window_end * whisper.audio.SAMPLE_RATE)]
+            
+            window_options = dict(options)
+            if detected_language:
+                window_options["language"] = detected_language
+            if segments:
+                # Carry context across the window boundary like Whisper does between its own windows
+                window_options["initial_prompt"] = "".join(s['text'] for s in segments[-5:])
+            
+            window_result = model.transcribe(clip, **window_options)
+            detected_language = detected_language or window_result.get('language')
+            window_segments = window_result.get('segments', [])
+            
+            next_offset = window_end
+            if window_end < total_seconds and len(window_segments) > 1:
+                # The last segment may be cut off by the window edge, so decode it again next time,
+                # unless its timestamp would not move us forward (e.g. looped timestamps)
+                resume_at = offset + window_segments[-1]['start']
+                if resume_at > offset:
+                    next_offset = resume_at
+                    window_segments = window_segments[:-1]
+            
+            for segment in window_segments:
+                segment['start'] += clip_start + offset
+                segment['end'] += clip_start + offset
+                segments.append(segment)
+            
+            offset = next_offset
+            save_checkpoint(key, {"offset": offset, "language": detected_language, "segments": segments})
+            print(f"💾 Checkpointed {offset:.1f} of {total_seconds:.1f} seconds")
+        
+        for index, segment in enumerate(segments):
+            segment['id'] = index
+        
+        result = {
+            "text": "".join(s['text'] for s in segments),
+            "segments": segments,
+            "language": detected_language,
+        }
+        clear_checkpoint(key)
         
         end_time = time.time()
         duration = end_time - start_time
@@ -57,6 +161,256 @@ def transcribe_with_whisper(audio_file, model_size="base", language=None, task="
         print(f"❌ Error during transcription: {e}")
         return None
 
+# Whisper's own fallback thresholds, reused to decide which segments the
+# cascade re-decodes with the larger model
+CASCADE_LOGPROB_THRESHOLD = -1.0
+CASCADE_NO_SPEECH_THRESHOLD = 0.6
+CASCADE_COMPRESSION_RATIO_THRESHOLD = 2.4
+
+# Extra audio decoded on each side of an escalated range so words at its edges keep their context
+CASCADE_PADDING_SECONDS = 0.75
+
+# Flagged ranges closer than this are merged, since decoding the gap is cheaper than a seam
+CASCADE_MERGE_GAP_SECONDS = 2.0
+
+# Above this share of escalated audio a single full pass with the accurate model is cheaper
+CASCADE_FULL_PASS_RATIO = 0.5
+
+def needs_escalation(segment,
+                     logprob_threshold=CASCADE_LOGPROB_THRESHOLD,
+                     no_speech_threshold=CASCADE_NO_SPEECH_THRESHOLD,
+                     compression_ratio_threshold=CASCADE_COMPRESSION_RATIO_THRESHOLD):
+    """Check a Whisper segment's confidence signals to see if it should be re-decoded"""
+    if segment.get('compression_ratio', 0.0) > compression_ratio_threshold:
+        # Highly repetitive text is the usual sign of a decoding loop
+        return True
+    
+    if segment.get('avg_logprob', 0.0) < logprob_threshold:
+        # Low confidence on what Whisper thinks is silence is not worth escalating
+        if segment.get('no_speech_prob', 0.0) > no_speech_threshold:
+            return False
+        return True
+    
+    return False
+
+def find_escalation_ranges(segments, max_gap=CASCADE_MERGE_GAP_SECONDS, **thresholds):
+    """Group low-confidence segments into (start, end) time ranges, merging ranges max_gap apart or closer"""
+    ranges = []
+    
+    for segment in segments:
+        if not needs_escalation(segment, **thresholds):
+            continue
+        if ranges and segment['start'] - ranges[-1][1] <= max_gap:
+            ranges[-1] = (ranges[-1][0], segment['end'])
+        else:
+            ranges.append((segment['start'], segment['end']))
+    
+    return ranges
+
+def pack_escalation_ranges(ranges, clip_start, clip_end, window_seconds=whisper.audio.CHUNK_LENGTH):
+    """
+    Pad each range and pack consecutive ranges into batches that fit one Whisper window
+    
+    Whisper pads every transcribe call to a full 30 s window, so decoding short
+    ranges one by one would cost more encoder time than the audio they cover.
+    
+    Returns:
+        list: Batches, each a list of (padded_start, padded_end, range_start, range_end)
+    """
+    batches = []
+    batch_seconds = 0.0
+    
+    for range_start, range_end in ranges:
+        padded_start = max(range_start - CASCADE_PADDING_SECONDS, clip_start)
+        padded_end = min(range_end + CASCADE_PADDING_SECONDS, clip_end)
+        piece_seconds = padded_end - padded_start
+        
+        if batches and batch_seconds + piece_seconds <= window_seconds:
+            batches[-1].append((padded_start, padded_end, range_start, range_end))
+            batch_seconds += piece_seconds
+        else:
+            batches.append([(padded_start, padded_end, range_start, range_end)])
+            batch_seconds = piece_seconds
+    
+    return batches
+
+def redecode_batch(model, audio, clip_start, batch, options):
+    """
+    Decode a batch of padded ranges as one clip and map its segments back onto the original timeline
+    
+    Returns:
+        list: For each range in the batch, its re-decoded segments clamped to the range;
+        segments that mostly fall in the padding are dropped, the fast pass covers them
+    """
+    pieces = []
+    piece_offsets = []
+    position = 0.0
+    
+    for padded_start, padded_end, _, _ in batch:
+        piece = audio[int((padded_start - clip_start) * whisper.audio.SAMPLE_RATE):
+                      int((padded_end - clip_start) * whisper.audio.SAMPLE_RATE)]
+        pieces.append(piece)
+        piece_offsets.append(position)
+        position += len(piece) / whisper.audio.SAMPLE_RATE
+    
+    redecoded = model.transcribe(np.concatenate(pieces), **options)
+    replacements = [[] for _ in batch]
+    
+    for segment in redecoded.get('segments', []):
+        midpoint = (segment['start'] + segment['end']) / 2
+        index = max(bisect.bisect_right(piece_offsets, midpoint) - 1, 0)
+        padded_start, _, range_start, range_end = batch[index]
+        shift = padded_start - piece_offsets[index]
+        new_start = segment['start'] + shift
+        new_end = segment['end'] + shift
+        
+        if not range_start <= (new_start + new_end) / 2 <= range_end:
+            continue
+        
+        segment['start'] = max(new_start, range_start)
+        segment['end'] = min(new_end, range_end)
+        replacements[index].append(segment)
+    
+    return replacements
+
+def splice_segments(segments, ranges, replacements):
+    """Replace the fast-pass segments inside each range with that range's re-decoded segments"""
+    spliced = []
+    remaining = iter(segments)
+    segment = next(remaining, None)
+    
+    for (range_start, range_end), new_segments in zip(ranges, replacements):
+        while segment is not None and segment['start'] < range_start:
+            spliced.append(segment)
+            segment = next(remaining, None)
+        while segment is not None and segment['end'] <= range_end:
+            segment = next(remaining, None)
+        spliced.extend(new_segments)
+    
+    while segment is not None:
+        spliced.append(segment)
+        segment = next(remaining, None)
+    
+    for index, spliced_segment in enumerate(spliced):
+        spliced_segment['id'] = index
+    
+    return spliced
+
+def transcribe_with_cascade(audio_file, fast_model_size="tiny", accurate_model_size="medium",
+                            language=None, task="transcribe", start=None, end=None, audio=None, **thresholds):
+    """
+    Transcribe with a fast model, then re-decode only low-confidence segments with a larger one
+    
+    Args:
+        audio_file: Path to audio file (supports MP3, WAV, FLAC, M4A, etc.)
+        fast_model_size: Whisper model used for the first pass over the whole file
+        accurate_model_size: Whisper model used for the escalated time ranges
+        language: Language code or None for auto-detection
+        task: 'transcribe' or 'translate'
+        start: Start of the range to transcribe in seconds, or None for the beginning
+        end: End of the range to transcribe in seconds, or None for the end of the file
+        audio: Samples of that range already decoded by load_audio_range, to avoid decoding again
+        **thresholds: Optional overrides for logprob_threshold, no_speech_threshold
+            and compression_ratio_threshold
+    
+    Returns:
+        dict: Transcription result like transcribe_with_whisper, plus a 'cascade'
+        entry reporting how much audio was escalated
+    
+    If more than CASCADE_FULL_PASS_RATIO of the audio needs escalating, the accurate
+    model transcribes everything in one pass instead.
+    """
+    # Decode once; both passes read the same samples
+    if audio is None:
+        try:
+            audio = load_audio_range(audio_file, start, end)
+        except Exception as e:
+            print(f"❌ Error loading audio: {e}")
+            return None
+    
+    result = transcribe_with_whisper(audio_file, model_size=fast_model_size, language=language, task=task,
+                                     start=start, end=end, audio=audio)
+    if not result:
+        return None
+    
+    clip_start = start or 0.0
+    segments = result.get('segments', [])
+    ranges = find_escalation_ranges(segments, **thresholds)
+    total_seconds = segments[-1]['end'] - clip_start if segments else 0.0
+    escalated_seconds = sum(range_end - range_start for range_start, range_end in ranges)
+    full_pass = False
+    
+    # Keep the language from the fast pass so short ranges are not re-detected
+    accurate_language = language or result.get('language')
+    
+    if ranges and total_seconds and escalated_seconds / total_seconds > CASCADE_FULL_PASS_RATIO:
+        print(f"🔁 {escalated_seconds:.1f}s of {total_seconds:.1f}s is low-confidence, "
+              f"re-transcribing everything with '{accurate_model_size}'...")
+        
+        accurate_result = transcribe_with_whisper(audio_file, model_size=accurate_model_size,
+                                                  language=accurate_language, task=task, start=start, end=end,
+                                                  audio=audio)
+        if accurate_result:
+            result = accurate_result
+            full_pass = True
+            ranges = [(clip_start, clip_start + total_seconds)]
+            escalated_seconds = total_seconds
+        else:
+            # The fast pass is still a usable transcript
+            print(f"❌ Full pass failed, keeping fast transcript")
+            ranges = []
+            escalated_seconds = 0.0
+    
+    elif ranges:
+        try:
+            model = whisper.load_model(accurate_model_size)
+            clip_end = clip_start + len(audio) / whisper.audio.SAMPLE_RATE
+            batches = pack_escalation_ranges(ranges, clip_start, clip_end)
+            
+            print(f"🔁 Re-decoding {len(ranges)} low-confidence range(s) ({escalated_seconds:.1f}s) "
+                  f"in {len(batches)} call(s) with '{accurate_model_size}'...")
+            
+            options = {
+                "task": task,
+                "fp16": False,
+                "language": accurate_language,
+            }
+            
+            replacements = []
+            for batch in batches:
+                batch_options = dict(options)
+                preceding = [s for s in segments if s['end'] <= batch[0][2]]
+                if preceding:
+                    # Carry the preceding text as context, like the checkpoint windows do
+                    batch_options["initial_prompt"] = "".join(s['text'] for s in preceding[-5:])
+                replacements.extend(redecode_batch(model, audio, clip_start, batch, batch_options))
+            
+            spliced = splice_segments(segments, ranges, replacements)
+            result['segments'] = spliced
+            result['text'] = "".join(s['text'] for s in spliced)
+            
+        except Exception as e:
+            # The fast pass is still a usable transcript
+            print(f"❌ Error during escalation, keeping fast transcript: {e}")
+            ranges = []
+            escalated_seconds = 0.0
+    
+    escalated_ratio = escalated_seconds / total_seconds if total_seconds else 0.0
+    result['cascade'] = {
+        "fast_model": fast_model_size,
+        "accurate_model": accurate_model_size,
+        "full_pass": full_pass,
+        "escalated_ranges": ranges,
+        "escalated_seconds": escalated_seconds,
+        "total_seconds": total_seconds,
+        "escalated_ratio": escalated_ratio,
+    }
+    
+    print(f"📊 Escalated {escalated_seconds:.1f}s of {total_seconds:.1f}s "
+          f"({escalated_ratio:.1%}) to '{accurate_model_size}'")
+    
+    return result
+
 def format_transcript(result, include_timestamps=True):
     """Format the Whisper result into a readable transcript"""
     if not result:
@@ -126,38 +480,88 @@ def process_latest_audio():
     else:
         print("❌ Failed to transcribe audio")
 
-def transcribe_specific_file(audio_file, model_size="base", language=None, task="transcribe"):
-    """Transcribe a specific audio file with Whisper"""
+def transcribe_specific_file(audio_file, model_size="base", language=None, task="transcribe",
+                             cascade_model=None, start=None, end=None):
+    """
+    Transcribe a specific audio file with Whisper
+    
+    If cascade_model is given, model_size is used as the fast first pass and only
+    low-confidence segments are re-decoded with cascade_model. If start and/or end
+    (in seconds) are given, only that range is decoded and transcribed.
+    """
     if not os.path.exists(audio_file):
         print(f"❌ File not found: {audio_file}")
         return
     
+    try:
+        check_range(start, end)
+    except ValueError as e:
+        print(f"❌ Invalid range: {e}")
+        return
+    
     print(f"📁 Processing: {audio_file}")
     
-    # Transcribe audio
-    result = transcribe_with_whisper(audio_file, model_size=model_size, language=language, task=task)
+    # Reuse the transcript of a known recording, even if this copy is encoded differently
+    options = {"engine": "whisper", "model_size": model_size, "cascade_model": cascade_model,
+               "language": language, "task": task, "start": start, "end": end}
+    audio = None
+    fingerprint = None
+    match = None
+    try:
+        # Decoded once here and handed to the transcription below on a cache miss
+        audio = load_audio_range(audio_file, start, end)
+        fingerprint = compute_fingerprint(audio)
+        match = find_match(fingerprint, options=options)
+    except Exception as e:
+        print(f"❌ Fingerprinting failed, transcribing from scratch: {e}")
     
-    if result:
-        # Format transcript
-        transcript = format_transcript(result, include_timestamps=True)
-        
-        # Save transcript to text file
-        base_name = os.path.splitext(audio_file)[0]
-        txt_file = f"{base_name}_whisper_transcript.txt"
+    if match:
+        print(f"♻️ Reusing transcript of: {match['source']}")
+        transcript = match['transcript']
+        preview_source = transcript
+    else:
+        # Transcribe audio
+        if cascade_model:
+            result = transcribe_with_cascade(audio_file, fast_model_size=model_size,
+                                             accurate_model_size=cascade_model,
+                                             language=language, task=task, start=start, end=end,
+                                             audio=audio)
+        else:
+            result = transcribe_with_whisper(audio_file, model_size=model_size, language=language, task=task,
+                                             start=start, end=end, audio=audio)
         
-        with open(txt_file, 'w', encoding='utf-8') as f:
-            f.write(f"Whisper Transcript of: {audio_file}\n")
-            f.write(transcript)
+        if not result:
+            print("❌ Failed to transcribe audio")
+            return
         
-        print(f"💾 Transcript saved to: {txt_file}")
-        print("\n" + "=" * 50)
-        print("📄 TRANSCRIPT PREVIEW:")
-        print("=" * 50)
-        preview_text = result['text'][:800] + "..." if len(result['text']) > 800 else result['text']
-        print(preview_text)
-        
-    else:
-        print("❌ Failed to transcribe audio")
+        # Format transcript
+        transcript = format_transcript(result, include_timestamps=True)
+        preview_source = result['text']
+    
+    # Save transcript to text file
+    base_name = os.path.splitext(audio_file)[0]
+    if start or end is not None:
+        base_name = f"{base_name}_{format_range(start, end)}"
+    txt_file = f"{base_name}_whisper_transcript.txt"
+    
+    with open(txt_file, 'w', encoding='utf-8') as f:
+        f.write(f"Whisper Transcript of: {audio_file}\n")
+        f.write(transcript)
+    
+    print(f"💾 Transcript saved to: {txt_file}")
+    
+    # Index only after the transcript is safely on disk; a failed index write must not lose it
+    if not match and fingerprint is not None:
+        try:
+            store_transcript(fingerprint, transcript, audio_file, options=options)
+        except Exception as e:
+            print(f"❌ Could not add transcript to fingerprint index: {e}")
+    
+    print("\n" + "=" * 50)
+    print("📄 TRANSCRIPT PREVIEW:")
+    print("=" * 50)
+    preview_text = preview_source[:800] + "..." if len(preview_source) > 800 else preview_source
+    print(preview_text)
 
 def list_available_models():
     """List available Whisper model sizes"""
@@ -179,6 +583,7 @@ def list_available_models():
     print("   • For speed: 'tiny' or 'base'")
     print("   • For balance: 'small' or 'turbo'") 
     print("   • For accuracy: 'medium' or 'large'")
+    print("   • For both: cascade 'tiny' -> 'medium' (cascade_model='medium')")
 
 if __name__ == "__main__":
     print("🎵 Whisper Audio to Text Converter")
@@ -196,4 +601,6 @@ if __name__ == "__main__":
     # transcribe_specific_file("Hair Fall - Dr.Bhanu Prasad Gadde.mp3", 
     #                         model_size="base", 
     #                         language=None,  # Auto-detect or specify: 'en', 'hi', 'te', etc.
-    #                         task="transcribe")  # or "translate" to convert to English
+    #                         task="transcribe",  # or "translate" to convert to English
+    #                         cascade_model=None,  # e.g. 'medium' to re-decode only unclear segments
+    #                         start=None, end=None)  # e.g. start=5400, end=5700 for minutes 90-95